@@ -2,7 +2,7 @@ import os
 from pathlib import Path
 
 import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 import streamlit as st
 
 import src.cli_model as cli_model
@@ -45,23 +45,14 @@ if not data_files['telemetry']:
 st.sidebar.success(f"Telemetry detected: {os.path.basename(data_files['telemetry'])}")
 
 
-@st.cache_data(show_spinner=False)
-def cached_vehicles(path: str):
-    return load_data.get_available_vehicles(path)
-
-
-@st.cache_data(show_spinner=False)
-def cached_laps(path: str, vehicle: str):
-    return load_data.get_available_laps(path, vehicle)
-
-
-vehicles = cached_vehicles(data_files['telemetry'])
+# Vehicle/lap listings and load_session all share one cached telemetry load
+vehicles = load_data.get_available_vehicles(data_files['telemetry'])
 if not vehicles:
     st.sidebar.error("No vehicles found in telemetry.")
     st.stop()
 vehicle_id = st.sidebar.selectbox("Select Vehicle ID", vehicles)
 
-laps = cached_laps(data_files['telemetry'], vehicle_id)
+laps = load_data.get_available_laps(data_files['telemetry'], vehicle_id)
 if not laps:
     st.sidebar.error("No laps found for this vehicle.")
     st.stop()
@@ -79,24 +70,51 @@ current_config = {
 
 should_run = run_requested or 'final_df' not in st.session_state or st.session_state.get('last_config') != current_config
 
+
+@st.cache_data(persist="disk", max_entries=32, show_spinner=False)
+def process_lap(path: str, mtime: float, vehicle: str, lap, nseg: int):
+    """End-to-end lap processing, memoized to disk so previously seen
+    (vehicle, lap, segments) combinations survive widget changes and app
+    restarts. mtime invalidates entries when the telemetry file changes."""
+    df = load_data.load_session(path, vehicle, lap)
+    df = segment_lap.segment_lap(df, num_segments=nseg)
+    metrics = compute_metrics.compute_segment_metrics(df)
+    metrics = cli_model.compute_cli(metrics)
+    return df, metrics
+
+
 if should_run:
     with st.spinner("Processing telemetry, segmenting lap, and computing CLI..."):
         try:
-            df = load_data.load_session(data_files['telemetry'], vehicle_id, lap_number)
+            df_segmented, metrics_df = process_lap(
+                data_files['telemetry'],
+                os.path.getmtime(data_files['telemetry']),
+                vehicle_id,
+                lap_number,
+                num_segments
+            )
         except Exception as e:
             st.error(f"Error processing data: {e}")
             st.stop()
 
-        df_segmented = segment_lap.segment_lap(df, num_segments=num_segments)
-        metrics_df = compute_metrics.compute_segment_metrics(df_segmented)
-        metrics_df = cli_model.compute_cli(metrics_df)
-
         metric_cols = ['segment_id', 'section_id', 'CLI', 'CLI_smooth',
                        'steering_entropy', 'throttle_jerk', 'brake_panic',
                        'lat_instability', 'long_jerk']
         metric_cols = [c for c in metric_cols if c in metrics_df.columns]
 
-        final_df = pd.merge(df_segmented, metrics_df[metric_cols], on='segment_id', how='left')
+        # segment_id is a small dense integer range, so broadcasting the
+        # per-segment metrics through a direct array gather replaces the
+        # hash join pd.merge would build over the whole lap
+        seg = df_segmented['segment_id'].to_numpy()
+        metric_seg_ids = metrics_df['segment_id'].to_numpy()
+        lookup_size = int(max(seg.max(), metric_seg_ids.max())) + 1
+        final_df = df_segmented
+        for col in metric_cols:
+            if col == 'segment_id':
+                continue
+            lookup = np.full(lookup_size, np.nan)
+            lookup[metric_seg_ids] = metrics_df[col].to_numpy()
+            final_df[col] = lookup[seg]
         final_df['vehicle_id'] = vehicle_id
         final_df['lap'] = lap_number
         if 'section_id' not in final_df.columns:
@@ -110,7 +128,16 @@ if 'final_df' in st.session_state and not st.session_state['final_df'].empty:
     final_df = st.session_state['final_df']
     metrics_df = st.session_state['metrics_df']
 
-    results = insights.compute_insights(final_df)
+    # Insights and the track map only depend on the analyzed lap, so
+    # short-circuit both on reruns (tab clicks, resizes) that don't
+    # change the selection. Keyed on the same config as should_run so a
+    # new telemetry file also invalidates them.
+    results_key = current_config
+    if st.session_state.get('results_key') != results_key:
+        st.session_state['insights'] = insights.compute_insights(final_df)
+        st.session_state['fig_map'] = track_map.plot_track_map(final_df)
+        st.session_state['results_key'] = results_key
+    results = st.session_state['insights']
     segment_col = results.get('segment_col', 'segment_id')
     cli_col = results.get('cli_col', 'CLI_smooth')
 
@@ -128,21 +155,29 @@ if 'final_df' in st.session_state and not st.session_state['final_df'].empty:
 
     with col_map:
         st.subheader("📍 Cognitive Load Track Map")
-        fig_map = track_map.plot_track_map(final_df)
-        st.pyplot(fig_map)
+        st.pyplot(st.session_state['fig_map'])
         st.caption("Map reconstructed via dead-reckoning. Red = High Load.")
 
     with col_graph:
         st.subheader("📈 CLI vs. Lap Segment")
-        fig_line, ax_line = plt.subplots(figsize=(10, 6))
-        if not metrics_df.empty:
-            ax_line.plot(metrics_df['segment_id'], metrics_df[cli_col], color='blue', linewidth=2, label='CLI (Smoothed)')
+        # Build the figure once and only swap the line data on reruns;
+        # text/legend/layout resolution dominates matplotlib startup
+        if 'line_fig' not in st.session_state:
+            fig_line, ax_line = plt.subplots(figsize=(10, 6))
+            ax_line.plot([], [], color='blue', linewidth=2, label='CLI (Smoothed)')
             ax_line.axhline(y=0.7, color='red', linestyle='--', alpha=0.5, label='High Load Threshold')
-        ax_line.set_xlabel("Track Segment")
-        ax_line.set_ylabel("Cognitive Load Index")
-        ax_line.set_title("Mental Fatigue Propagation")
-        ax_line.legend()
-        ax_line.grid(True, alpha=0.3)
+            ax_line.set_xlabel("Track Segment")
+            ax_line.set_ylabel("Cognitive Load Index")
+            ax_line.set_title("Mental Fatigue Propagation")
+            ax_line.legend()
+            ax_line.grid(True, alpha=0.3)
+            st.session_state['line_fig'] = fig_line
+        fig_line = st.session_state['line_fig']
+        if not metrics_df.empty:
+            ax_line = fig_line.axes[0]
+            ax_line.lines[0].set_data(metrics_df['segment_id'], metrics_df[cli_col])
+            ax_line.relim()
+            ax_line.autoscale_view()
         st.pyplot(fig_line)
 
     st.divider()
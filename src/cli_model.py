@@ -1,47 +1,65 @@
 import pandas as pd
 import numpy as np
+from numba import njit
 
-def normalize_series(series):
+@njit(cache=True)
+def _centered_mean3(a):
     """
-    Min-Max normalization to 0-1 range.
+    Centered 3-wide moving mean with min_periods=1 edge handling,
+    equivalent to rolling(window=3, center=True, min_periods=1).mean()
+    without the pandas rolling-engine overhead. NaNs are skipped like
+    the pandas rolling mean; all-NaN windows stay NaN.
     """
-    min_val = series.min()
-    max_val = series.max()
-    if max_val - min_val == 0:
-        return series * 0
-    return (series - min_val) / (max_val - min_val)
+    n = a.shape[0]
+    out = np.empty(n)
+    for i in range(n):
+        lo = i - 1 if i > 0 else 0
+        hi = i + 2 if i + 2 < n else n
+        s = 0.0
+        count = 0
+        for j in range(lo, hi):
+            if not np.isnan(a[j]):
+                s += a[j]
+                count += 1
+        out[i] = s / count if count > 0 else np.nan
+    return out
+
+def normalize_columns(A):
+    """
+    Min-Max normalization of each column of a 2D array to 0-1 range,
+    done in a single pass over the matrix. Constant columns map to 0.
+    NaN entries are ignored for the column ranges (like Series.min/max)
+    and stay NaN in the output.
+    """
+    mn = np.nanmin(A, axis=0)
+    rng = np.nanmax(A, axis=0) - mn
+    rng[rng == 0] = 1
+    return (A - mn) / rng
 
 def compute_cli(metrics_df):
     """
     Computes Cognitive Load Index (CLI) from metrics.
     """
     df = metrics_df.copy()
-    
-    # Normalize metrics
-    # Higher values should indicate higher load
-    df['norm_steering'] = normalize_series(df['steering_entropy'])
-    df['norm_throttle'] = normalize_series(df['throttle_jerk'])
-    df['norm_brake'] = normalize_series(df['brake_panic'])
-    df['norm_lat'] = normalize_series(df['lat_instability'])
-    
-    # CLI Formula (Weighted Sum)
+
+    # Normalize metrics (higher values should indicate higher load),
+    # then apply the weighted sum as one matrix-vector product.
     # Weights can be adjusted. Assuming Steering is most indicative of cognitive load (corrections).
-    w_steering = 0.4
-    w_throttle = 0.3
-    w_brake = 0.2
-    w_lat = 0.1
-    
-    df['CLI'] = (
-        w_steering * df['norm_steering'] +
-        w_throttle * df['norm_throttle'] +
-        w_brake * df['norm_brake'] +
-        w_lat * df['norm_lat']
-    )
+    cols = ['steering_entropy', 'throttle_jerk', 'brake_panic', 'lat_instability']
+    weights = np.array([0.4, 0.3, 0.2, 0.1])
+
+    N = normalize_columns(df[cols].to_numpy(dtype=np.float64))
+    df['CLI'] = N @ weights
     
     # Smooth CLI
     # Rolling average over 3 segments to reduce noise
-    df['CLI_smooth'] = df['CLI'].rolling(window=3, center=True, min_periods=1).mean()
-    
+    df['CLI_smooth'] = _centered_mean3(df['CLI'].to_numpy(dtype=np.float64))
+
+    # Rematerialize with contiguous per-column buffers: upstream
+    # groupby/copy chains can leave blocks Fortran-ordered, which slows
+    # every later column-wise op on this frame
+    df = pd.DataFrame({c: np.ascontiguousarray(df[c].to_numpy()) for c in df.columns})
+
     return df
 
 if __name__ == "__main__":
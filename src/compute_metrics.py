@@ -1,60 +1,119 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import entropy
+from numba import njit
 
-def calculate_shannon_entropy(series, bins=20):
+@njit(cache=True)
+def _segment_accumulate(seg, thr, brk, ax, accy, dist, num_segments):
     """
-    Calculates Shannon entropy of a signal's histogram.
+    Single-pass per-segment accumulation of all the diff/mean/std inputs.
+
+    Walks the samples once, keeping running sums and counts in small
+    per-segment arrays (they fit in L1 cache), instead of one groupby
+    reduction per metric over the full lap.
+    """
+    s_thr = np.zeros(num_segments)
+    n_thr = np.zeros(num_segments)
+    s_brk = np.zeros(num_segments)
+    n_brk = np.zeros(num_segments)
+    s_ax = np.zeros(num_segments)
+    s_y = np.zeros(num_segments)
+    q_y = np.zeros(num_segments)
+    s_d = np.zeros(num_segments)
+    n_all = np.zeros(num_segments)
+
+    for i in range(seg.shape[0]):
+        k = seg[i]
+        n_all[k] += 1
+        s_y[k] += accy[i]
+        q_y[k] += accy[i] * accy[i]
+        s_d[k] += dist[i]
+        if i > 0:
+            # Diffs attribute to the segment of the later sample
+            s_thr[k] += abs(thr[i] - thr[i - 1])
+            n_thr[k] += 1
+            d_brk = brk[i] - brk[i - 1]
+            if d_brk > 0:
+                # We care about sudden INCREASES (panic)
+                s_brk[k] += d_brk
+                n_brk[k] += 1
+            s_ax[k] += abs(ax[i] - ax[i - 1])
+
+    return s_thr, n_thr, s_brk, n_brk, s_ax, s_y, q_y, s_d, n_all
+
+def calculate_segment_entropies(values, segment_ids, bins=20):
+    """
+    Calculates Shannon entropy of a signal's histogram for every segment at once.
+
+    Instead of one np.histogram call per segment, the signal is quantized
+    into integer buckets once (segments share the same value range), and a
+    single np.bincount keyed by segment_id*bins+bucket builds the full
+    (num_segments, bins) histogram in one pass.
+    Returns an array of entropies indexed by segment_id.
     """
-    counts, _ = np.histogram(series, bins=bins, density=True)
-    # Filter zero counts to avoid log(0)
-    counts = counts[counts > 0]
-    return entropy(counts)
+    values = np.asarray(values, dtype=np.float64)
+    seg = np.asarray(segment_ids, dtype=np.int64)
+    num_segments = int(seg.max()) + 1
+
+    lo, hi = values.min(), values.max()
+    idx = np.clip(((values - lo) / (hi - lo + 1e-12) * bins).astype(np.int64), 0, bins - 1)
+
+    flat = seg * bins + idx
+    counts = np.bincount(flat, minlength=num_segments * bins)
+    counts = counts.reshape(num_segments, bins).astype(np.float64)
+
+    p = counts / counts.sum(axis=1, keepdims=True).clip(min=1)
+    # Mask zero bins to avoid log(0)
+    logp = np.where(p > 0, np.log(p), 0.0)
+    return -(p * logp).sum(axis=1)
 
 def compute_segment_metrics(df):
     """
     Computes metrics for each segment.
+
+    All diff-based metrics come out of one fused JIT pass over the sample
+    arrays (see _segment_accumulate); only the final sums-to-means step
+    runs on the tiny per-segment arrays.
     """
-    metrics = []
-    
-    grouped = df.groupby('segment_id')
-    
-    for segment_id, group in grouped:
-        # Skip empty segments
-        if group.empty:
-            continue
-            
-        # 1. Steering Entropy (Using Shannon Entropy of the angle distribution as a proxy for complexity)
-        # A more complex driver workload often leads to more corrective inputs -> higher entropy
-        steering_entropy = calculate_shannon_entropy(group['Steering_Angle'])
-        
-        # 2. Throttle Jerk (Micro-corrections)
-        # First derivative of throttle (approx)
-        throttle_diff = group['throttle'].diff().fillna(0).abs()
-        throttle_jerk = throttle_diff.mean()
-        
-        # 3. Brake Panic (Sudden high pressure changes)
-        brake_diff = group['brake_pressure'].diff().fillna(0)
-        # We care about sudden INCREASES (panic)
-        brake_panic = brake_diff[brake_diff > 0].mean() if not brake_diff[brake_diff > 0].empty else 0
-        
-        # 4. Lateral Instability (Variance in lateral acceleration)
-        lat_instability = group['accy'].std()
-        
-        # 5. Longitudinal Jerk (Variance or mean jerk)
-        long_jerk = group['accx'].diff().fillna(0).abs().mean()
-        
-        metrics.append({
-            'segment_id': segment_id,
-            'steering_entropy': steering_entropy,
-            'throttle_jerk': throttle_jerk,
-            'brake_panic': brake_panic,
-            'lat_instability': lat_instability,
-            'long_jerk': long_jerk,
-            'avg_dist': group['Laptrigger_lapdist_dls'].mean() # For plotting
-        })
-        
-    return pd.DataFrame(metrics)
+    seg = df['segment_id'].to_numpy(dtype=np.int64)
+    num_segments = int(seg.max()) + 1
+
+    s_thr, n_thr, s_brk, n_brk, s_ax, s_y, q_y, s_d, n_all = _segment_accumulate(
+        seg,
+        df['throttle'].to_numpy(dtype=np.float64),
+        df['brake_pressure'].to_numpy(dtype=np.float64),
+        df['accx'].to_numpy(dtype=np.float64),
+        df['accy'].to_numpy(dtype=np.float64),
+        df['Laptrigger_lapdist_dls'].to_numpy(dtype=np.float64),
+        num_segments
+    )
+
+    # 2. Throttle Jerk (Micro-corrections): mean absolute throttle delta
+    throttle_jerk = np.where(n_thr > 0, s_thr / np.maximum(n_thr, 1), np.nan)
+    # 3. Brake Panic: mean positive pressure delta; no positive deltas -> 0
+    brake_panic = np.where(n_brk > 0, s_brk / np.maximum(n_brk, 1), 0.0)
+    # 4. Lateral Instability: sample std (ddof=1) of lateral acceleration
+    mean_y = s_y / np.maximum(n_all, 1)
+    var_y = (q_y - n_all * mean_y * mean_y) / np.maximum(n_all - 1, 1)
+    lat_instability = np.where(n_all > 1, np.sqrt(np.maximum(var_y, 0)), np.nan)
+    # 5. Longitudinal Jerk
+    long_jerk = np.where(n_thr > 0, s_ax / np.maximum(n_thr, 1), np.nan)
+    avg_dist = s_d / np.maximum(n_all, 1)  # For plotting
+
+    # 1. Steering Entropy (Using Shannon Entropy of the angle distribution as a proxy for complexity)
+    # A more complex driver workload often leads to more corrective inputs -> higher entropy
+    entropies = calculate_segment_entropies(df['Steering_Angle'].values, seg)
+
+    # Only emit segments that actually contain samples
+    segment_ids = np.nonzero(n_all > 0)[0]
+    return pd.DataFrame({
+        'segment_id': segment_ids,
+        'steering_entropy': entropies[segment_ids],
+        'throttle_jerk': throttle_jerk[segment_ids],
+        'brake_panic': brake_panic[segment_ids],
+        'lat_instability': lat_instability[segment_ids],
+        'long_jerk': long_jerk[segment_ids],
+        'avg_dist': avg_dist[segment_ids],
+    })
 
 if __name__ == "__main__":
     # Test stub
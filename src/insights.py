@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from . import cli_model
+
 def compute_insights(df):
     """
     Analyzes the dataframe to find top high/low load segments and primary causes.
@@ -19,19 +21,16 @@ def compute_insights(df):
         available_cols.remove('section_id')
 
     df_segments = df.groupby('section_id')[available_cols].first().reset_index()
+
+    # Rematerialize the groupby result with contiguous per-column buffers
+    # so the selects/sorts below run on cache-friendly arrays
+    df_segments = pd.DataFrame({c: np.ascontiguousarray(df_segments[c].to_numpy())
+                                for c in df_segments.columns})
     
-    # Normalize metrics for comparison (0-1 scale) to find "cause"
+    # Normalize metrics for comparison (0-1 scale) to find "cause".
+    # All columns are normalized in one matrix pass instead of per-metric
+    # min/max loops.
     metrics = ['steering_entropy', 'throttle_jerk', 'brake_panic', 'lat_instability', 'long_jerk']
-    df_norm = df_segments.copy()
-    
-    for m in metrics:
-        if m in df_norm.columns:
-            min_val = df_norm[m].min()
-            max_val = df_norm[m].max()
-            if max_val - min_val > 0:
-                df_norm[f'{m}_norm'] = (df_norm[m] - min_val) / (max_val - min_val)
-            else:
-                df_norm[f'{m}_norm'] = 0
 
     # Define weights
     weights = {
@@ -42,36 +41,42 @@ def compute_insights(df):
         'long_jerk': 0.0
     }
 
-    def get_primary_cause(row):
-        max_val = -1
-        cause = "Unknown"
-        for m in metrics:
-            norm_col = f'{m}_norm'
-            if norm_col in row:
-                w = weights.get(m, 0.1)
-                weighted_val = row[norm_col] * w
-                if weighted_val > max_val:
-                    max_val = weighted_val
-                    cause = m
-        return cause
+    # Primary cause = metric with the highest weighted normalized value.
+    # Done as one matrix multiply + argmax instead of a per-row apply.
+    avail_metrics = [m for m in metrics if m in df_segments.columns]
+    N = cli_model.normalize_columns(df_segments[avail_metrics].to_numpy(dtype=np.float64))
+    w = np.array([weights.get(m, 0.1) for m in avail_metrics])
+    # NaN metrics (e.g. std of a single-sample segment) must not win the
+    # argmax; the old per-row comparison skipped them implicitly
+    scores = N * w
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    winner = np.argmax(scores, axis=1).astype(np.int8)
+    df_segments['Primary Cause'] = np.array(avail_metrics)[winner]
 
-    df_segments['Primary Cause'] = df_norm.apply(get_primary_cause, axis=1)
-
-    # Top 5 High Load
-    top_5_high = df_segments.sort_values('CLI_smooth', ascending=False).head(5)
-    
-    # Top 5 Low Load
-    top_5_low = df_segments.sort_values('CLI_smooth', ascending=True).head(5)
+    # Top 5 High / Low Load: O(N) partial selection instead of sorting
+    # the whole frame twice
+    cli = df_segments['CLI_smooth'].to_numpy()
+    k = min(5, len(cli))
+    if len(cli) > k:
+        hi = np.argpartition(-cli, k)[:k]
+        lo = np.argpartition(cli, k)[:k]
+    else:
+        hi = np.arange(len(cli))
+        lo = np.arange(len(cli))
+    top_5_high = df_segments.iloc[hi[np.argsort(-cli[hi])]]
+    top_5_low = df_segments.iloc[lo[np.argsort(cli[lo])]]
 
     # Stats
     avg_cli = df_segments['CLI_smooth'].mean()
     max_cli = df_segments['CLI_smooth'].max()
     
     # Most common cause in high load areas (top 20%)
+    # The cause is a fixed enum of metric names, so counting the int8
+    # winner codes with bincount beats .mode()'s sort + Series allocation
     high_load_threshold = df_segments['CLI_smooth'].quantile(0.8)
-    high_load_segments = df_segments[df_segments['CLI_smooth'] >= high_load_threshold]
-    if not high_load_segments.empty:
-        common_cause = high_load_segments['Primary Cause'].mode()[0]
+    high_codes = winner[df_segments['CLI_smooth'].to_numpy() >= high_load_threshold]
+    if len(high_codes):
+        common_cause = avail_metrics[int(np.bincount(high_codes, minlength=len(avail_metrics)).argmax())]
     else:
         common_cause = "N/A"
         
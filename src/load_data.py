@@ -1,127 +1,132 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import os
-import glob
+import fnmatch
+import streamlit as st
+
+from . import processor
+
+# Known columns from previous exploration (file can ship headerless)
+RAW_COLUMNS = ['expire_at', 'lap', 'meta_event', 'meta_session', 'meta_source', 'meta_time',
+               'original_vehicle_id', 'outing', 'telemetry_name', 'telemetry_value',
+               'timestamp', 'vehicle_id', 'vehicle_number']
+
+# Only these columns are needed downstream (pivot + dead reckoning)
+USED_COLUMNS = ['timestamp', 'vehicle_id', 'lap', 'telemetry_name', 'telemetry_value']
+
+# Compact parse dtypes: float32 values halve the memory bandwidth of every
+# downstream diff/groupby, dictionary-encoded ids group cheaply, int32 laps
+# keep the lap index small. telemetry_name stays a plain string because the
+# pivot unstacks it (a categorical would expand to every name in the file).
+RAW_COLUMN_TYPES = {
+    'vehicle_id': pa.dictionary(pa.int32(), pa.string()),
+    'telemetry_value': pa.float32(),
+    'lap': pa.int32(),
+}
 
 def scan_data_directory(data_dir='data'):
     """
     Scans the data directory for required files.
     Returns a dictionary with file paths.
     """
-    files = {
-        'telemetry': None,
-        'analysis': None,
-        'weather': None,
-        'lap_time': None
-    }
-    
-    # Search patterns
+    # Search patterns, matched case-insensitively against lowercased names
     patterns = {
         'telemetry': '*telemetry_data.csv',
-        'analysis': '*AnalysisEndurance*.CSV', # Case sensitive check might be needed
-        'weather': '*Weather*.CSV',
+        'analysis': '*analysisendurance*.csv',
+        'weather': '*weather*.csv',
         'lap_time': '*lap_time*.csv'
     }
-    
-    for key, pattern in patterns.items():
-        # Case insensitive search
-        matches = glob.glob(os.path.join(data_dir, pattern)) + \
-                  glob.glob(os.path.join(data_dir, pattern.lower())) + \
-                  glob.glob(os.path.join(data_dir, pattern.upper()))
-        
-        # Also search recursively in subdirectories (like "Race 1")
-        if not matches:
-             matches = glob.glob(os.path.join(data_dir, '**', pattern), recursive=True) + \
-                       glob.glob(os.path.join(data_dir, '**', pattern.lower()), recursive=True) + \
-                       glob.glob(os.path.join(data_dir, '**', pattern.upper()), recursive=True)
-
-        if matches:
-            files[key] = matches[0] # Pick the first match
-            
+
+    files = {key: None for key in patterns}
+
+    # A single walk covers the data dir and its subdirectories (like
+    # "Race 1") instead of separate glob passes per case variant
+    for root, _, names in os.walk(data_dir):
+        for name in sorted(names):
+            name_lower = name.lower()
+            for key, pattern in patterns.items():
+                if files[key] is None and fnmatch.fnmatch(name_lower, pattern):
+                    files[key] = os.path.join(root, name)  # Pick the first match
+
     return files
 
+@st.cache_resource(show_spinner="Loading telemetry...")
+def load_all(telemetry_file):
+    """
+    Loads the raw telemetry file ONCE and indexes it by vehicle and lap.
+
+    Returns {vehicle_id: {lap: sub-DataFrame}} kept in RAM via
+    st.cache_resource, so vehicle/lap selectors and load_session all read
+    from the same single pass instead of re-scanning the CSV on every
+    Streamlit rerun.
+    """
+    # The file might be headerless or have malformed header as discovered before.
+    with open(telemetry_file, 'r') as f:
+        first_line = f.readline()
+    has_header = 'vehicle_id' in first_line
+
+    # pyarrow parses in parallel threads; only the five used columns are
+    # materialized and bad rows are skipped like on_bad_lines='skip' did.
+    if has_header:
+        read_options = pacsv.ReadOptions()
+    else:
+        # Skip the first line if it's garbage/data treated as header
+        read_options = pacsv.ReadOptions(column_names=RAW_COLUMNS, skip_rows=1)
+
+    table = pacsv.read_csv(
+        telemetry_file,
+        read_options=read_options,
+        parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+        convert_options=pacsv.ConvertOptions(include_columns=USED_COLUMNS,
+                                             column_types=RAW_COLUMN_TYPES)
+    )
+    df = table.to_pandas()
+    df = df.dropna(subset=['vehicle_id', 'lap'])
+
+    return {
+        vehicle: {lap: sub.copy() for lap, sub in group.groupby('lap', observed=True)}
+        for vehicle, group in df.groupby('vehicle_id', observed=True)
+    }
+
 def get_available_vehicles(telemetry_file):
     """
-    Scans the telemetry file for unique vehicle_ids.
-    Reads in chunks to be memory efficient.
+    Returns the unique vehicle_ids in the telemetry file.
+    Served from the cached single-pass load.
     """
     if not telemetry_file or not os.path.exists(telemetry_file):
         return []
-        
-    unique_vehicles = set()
+
     try:
-        # Read only vehicle_id column
-        # Note: The file might be headerless or have malformed header as discovered before.
-        # We'll try to detect header or use the known column names from process_telemetry.py
-        
-        # Known columns from previous exploration
-        names = ['expire_at', 'lap', 'meta_event', 'meta_session', 'meta_source', 'meta_time', 
-                 'original_vehicle_id', 'outing', 'telemetry_name', 'telemetry_value', 
-                 'timestamp', 'vehicle_id', 'vehicle_number']
-                 
-        # Try reading first few lines to check header
-        with open(telemetry_file, 'r') as f:
-            first_line = f.readline()
-            
-        has_header = 'vehicle_id' in first_line
-        
-        chunk_size = 100000
-        read_args = {
-            'chunksize': chunk_size,
-            'usecols': ['vehicle_id'],
-            'on_bad_lines': 'skip'
-        }
-        
-        if not has_header:
-            read_args['names'] = names
-            read_args['header'] = 0 # Skip the first line if it's garbage/data treated as header
-        
-        for chunk in pd.read_csv(telemetry_file, **read_args):
-            if 'vehicle_id' in chunk.columns:
-                unique_vehicles.update(chunk['vehicle_id'].dropna().unique())
-                
+        return sorted(load_all(telemetry_file).keys())
     except Exception as e:
         print(f"Error scanning vehicles: {e}")
         return []
-        
-    return sorted(list(unique_vehicles))
 
 def get_available_laps(telemetry_file, vehicle_id):
     """
-    Scans for available laps for a specific vehicle.
+    Returns the available laps for a specific vehicle.
+    Served from the cached single-pass load.
     """
     if not telemetry_file or not os.path.exists(telemetry_file):
         return []
-        
-    unique_laps = set()
+
     try:
-        names = ['expire_at', 'lap', 'meta_event', 'meta_session', 'meta_source', 'meta_time', 
-                 'original_vehicle_id', 'outing', 'telemetry_name', 'telemetry_value', 
-                 'timestamp', 'vehicle_id', 'vehicle_number']
-                 
-        with open(telemetry_file, 'r') as f:
-            first_line = f.readline()
-        has_header = 'vehicle_id' in first_line
-        
-        read_args = {
-            'chunksize': 100000,
-            'usecols': ['vehicle_id', 'lap'],
-            'on_bad_lines': 'skip'
-        }
-        
-        if not has_header:
-            read_args['names'] = names
-            read_args['header'] = 0
-            
-        for chunk in pd.read_csv(telemetry_file, **read_args):
-            if 'vehicle_id' in chunk.columns and 'lap' in chunk.columns:
-                laps = chunk[chunk['vehicle_id'] == vehicle_id]['lap'].dropna().unique()
-                unique_laps.update(laps)
-                
+        return sorted(load_all(telemetry_file).get(vehicle_id, {}).keys())
     except Exception as e:
         print(f"Error scanning laps: {e}")
         return []
-        
-    return sorted(list(unique_laps))
+
+def load_session(telemetry_file, vehicle_id, lap):
+    """
+    Returns the processed telemetry for a specific vehicle and lap.
+    The raw rows come from the cached load; only the pivot/dead-reckoning
+    work runs per selection.
+    """
+    laps = load_all(telemetry_file).get(vehicle_id, {})
+    if lap not in laps:
+        raise ValueError(f"No data found for {vehicle_id} Lap {lap}")
+    return processor.process_raw_frame(laps[lap].copy())
 
 def load_telemetry(file_path):
     """
@@ -1,51 +1,67 @@
+import math
+
 import pandas as pd
 import numpy as np
+from numba import njit, prange
 
-def process_lap_data(telemetry_file, vehicle_id, lap):
+@njit(cache=True, parallel=True)
+def _fill_2d(a):
     """
-    Processes raw telemetry for a specific vehicle and lap.
-    Performs pivoting, cleaning, and dead reckoning.
+    In-place forward fill then backward fill of a 2D float buffer, one
+    column per thread. One pass each way, no intermediate frame copies.
+    """
+    n, m = a.shape
+    for j in prange(m):
+        # Forward pass: propagate the last seen value down
+        last = np.nan
+        for i in range(n):
+            v = a[i, j]
+            if np.isnan(v):
+                a[i, j] = last
+            else:
+                last = v
+        # Backward pass: handle the leading NaNs symmetrically
+        last = np.nan
+        for i in range(n - 1, -1, -1):
+            v = a[i, j]
+            if np.isnan(v):
+                a[i, j] = last
+            else:
+                last = v
+
+@njit(cache=True, fastmath=True)
+def _integrate_path(speed, wheel_angle, dt, wheelbase):
+    """
+    Bicycle-model dead reckoning in one fused pass.
+
+    Walks the sample arrays once, keeping heading/position/distance in
+    scalars, instead of the ~7 separate NumPy passes (tan, cumsum, cos,
+    sin, three more cumsums) the vectorized version needed.
+    """
+    n = speed.shape[0]
+    out_x = np.empty(n)
+    out_y = np.empty(n)
+    out_d = np.empty(n)
+    h = 0.0
+    x = 0.0
+    y = 0.0
+    d = 0.0
+    for i in range(n):
+        # yaw_rate = v / L * tan(delta)
+        h += speed[i] / wheelbase * math.tan(wheel_angle[i]) * dt[i]
+        x += speed[i] * math.cos(h) * dt[i]
+        y += speed[i] * math.sin(h) * dt[i]
+        d += speed[i] * dt[i]
+        out_x[i] = x
+        out_y[i] = y
+        out_d[i] = d
+    return out_x, out_y, out_d
+
+def process_raw_frame(df_raw):
+    """
+    Pivots, cleans, and dead-reckons an already-filtered raw telemetry frame
+    (single vehicle, single lap, long format).
     """
-    print(f"Processing {vehicle_id} Lap {lap} from {telemetry_file}...")
-    
-    # Column names for raw data (based on known format)
-    names = ['expire_at', 'lap', 'meta_event', 'meta_session', 'meta_source', 'meta_time', 
-             'original_vehicle_id', 'outing', 'telemetry_name', 'telemetry_value', 
-             'timestamp', 'vehicle_id', 'vehicle_number']
-    
-    # 1. Load and Filter Data
-    chunks = []
-    chunk_size = 100000
-    
-    # Check header
-    with open(telemetry_file, 'r') as f:
-        first_line = f.readline()
-    has_header = 'vehicle_id' in first_line
-    
-    read_args = {
-        'chunksize': chunk_size,
-        'on_bad_lines': 'skip',
-        'low_memory': False
-    }
-    if not has_header:
-        read_args['names'] = names
-        read_args['header'] = 0
-        
-    for chunk in pd.read_csv(telemetry_file, **read_args):
-        # Filter by vehicle and lap
-        if 'vehicle_id' in chunk.columns and 'lap' in chunk.columns:
-            filtered = chunk[
-                (chunk['vehicle_id'] == vehicle_id) & 
-                (chunk['lap'] == lap)
-            ]
-            if not filtered.empty:
-                chunks.append(filtered)
-                
-    if not chunks:
-        raise ValueError(f"No data found for {vehicle_id} Lap {lap}")
-        
-    df_raw = pd.concat(chunks)
-    
     # 2. Pivot Data
     # We need 'timestamp' as index, 'telemetry_name' as columns, 'telemetry_value' as values
     # Also keep 'vehicle_id', 'lap', 'vehicle_number'
@@ -54,15 +70,28 @@ def process_lap_data(telemetry_file, vehicle_id, lap):
     df_raw['timestamp'] = pd.to_datetime(df_raw['timestamp'])
     
     # Pivot
-    df_pivot = df_raw.pivot_table(
-        index=['timestamp', 'vehicle_id', 'lap'], 
-        columns='telemetry_name', 
-        values='telemetry_value',
-        aggfunc='first' # Handle duplicates
-    ).reset_index()
-    
-    # Forward fill / Backward fill to handle async signals
-    df_pivot = df_pivot.sort_values('timestamp').ffill().bfill()
+    # We only need the first value per (timestamp, telemetry_name), so
+    # dedup + unstack takes the fast 1D path instead of pivot_table's
+    # generic aggfunc machinery.
+    df_raw = df_raw.drop_duplicates(subset=['timestamp', 'telemetry_name'], keep='first')
+    df_pivot = (
+        df_raw.set_index(['timestamp', 'telemetry_name'])['telemetry_value']
+        .unstack('telemetry_name')
+        .reset_index()
+    )
+    # The frame is already filtered to one vehicle and lap, so carry them as constants
+    df_pivot['vehicle_id'] = df_raw['vehicle_id'].iloc[0]
+    df_pivot['lap'] = df_raw['lap'].iloc[0]
+
+    # Forward fill / Backward fill to handle async signals.
+    # Each channel is independent, so fill the 2D float buffer in one JIT
+    # pass per direction instead of two full-frame pandas copies.
+    df_pivot = df_pivot.sort_values('timestamp')
+    num_cols = df_pivot.select_dtypes(include='floating').columns
+    if len(num_cols) > 0:
+        arr = df_pivot[num_cols].to_numpy(dtype=np.float32, copy=True)
+        _fill_2d(arr)
+        df_pivot[num_cols] = arr
     
     # 3. Rename Columns to Standard Names
     # Map raw names to standard names used in pipeline
@@ -82,7 +111,12 @@ def process_lap_data(telemetry_file, vehicle_id, lap):
     for col in required_cols:
         if col not in df_pivot.columns:
             df_pivot[col] = 0.0 # Fill missing with 0
-            
+
+    # Downcast signals to float32: the later diffs/groupbys/rollings are
+    # memory-bound, so halving bytes per element doubles their bandwidth
+    for col in required_cols:
+        df_pivot[col] = df_pivot[col].astype('float32')
+
     # 4. Normalize Signals
     # Steering: -450 to 450 -> -1 to 1 (approx)
     df_pivot['Steering_Angle'] = df_pivot['Steering_Angle'] / 450.0
@@ -119,27 +153,21 @@ def process_lap_data(telemetry_file, vehicle_id, lap):
     else:
         speed_ms = df_pivot['speed']
         
-    # Yaw Rate (rad/s)
-    # yaw_rate = v / L * tan(delta)
-    yaw_rate = (speed_ms / L) * np.tan(wheel_angle)
-    
-    # Heading (psi)
-    heading = (yaw_rate * df_pivot['dt']).cumsum()
-    
-    # Velocity components
-    vx = speed_ms * np.cos(heading)
-    vy = speed_ms * np.sin(heading)
-    
-    # Position
-    df_pivot['X'] = (vx * df_pivot['dt']).cumsum()
-    df_pivot['Y'] = (vy * df_pivot['dt']).cumsum()
-    
+    # Integrate yaw rate / heading / position / distance in one JIT pass
+    out_x, out_y, out_d = _integrate_path(
+        speed_ms.to_numpy(dtype=np.float64),
+        wheel_angle.to_numpy(dtype=np.float64),
+        df_pivot['dt'].to_numpy(dtype=np.float64),
+        L
+    )
+    df_pivot['X'] = out_x
+    df_pivot['Y'] = out_y
+
     # Map X/Y to longitude/latitude for compatibility with pipeline
     df_pivot['longitude'] = df_pivot['X']
     df_pivot['latitude'] = df_pivot['Y']
-    
-    # 6. Calculate Lap Distance (Laptrigger_lapdist_dls)
-    # Integrate speed
-    df_pivot['Laptrigger_lapdist_dls'] = (speed_ms * df_pivot['dt']).cumsum()
-    
+
+    # 6. Calculate Lap Distance (Laptrigger_lapdist_dls): integrated speed
+    df_pivot['Laptrigger_lapdist_dls'] = out_d
+
     return df_pivot
@@ -5,17 +5,20 @@ def segment_lap(df, num_segments=60):
     """
     Segments the lap into equal distance parts.
     """
-    # Ensure sorted by distance
-    df = df.sort_values('Laptrigger_lapdist_dls').reset_index(drop=True)
-    
-    max_dist = df['Laptrigger_lapdist_dls'].max()
-    segment_length = max_dist / num_segments
-    
-    # Assign segment ID
-    # We use floor division, but clip to num_segments-1 for the very last point
-    df['segment_id'] = (df['Laptrigger_lapdist_dls'] // segment_length).astype(int)
-    df['segment_id'] = df['segment_id'].clip(upper=num_segments - 1)
-    
+    # Distance is already monotonic after processing (integrated speed),
+    # so only resort when that doesn't hold
+    d = df['Laptrigger_lapdist_dls'].to_numpy()
+    if not np.all(np.diff(d) >= 0):
+        df = df.sort_values('Laptrigger_lapdist_dls').reset_index(drop=True)
+        d = df['Laptrigger_lapdist_dls'].to_numpy()
+
+    max_dist = d[-1]
+    inv_length = num_segments / max_dist
+
+    # Assign segment ID: one multiply + cast, clipped to num_segments-1
+    # for the very last point. int32 keeps the downstream groupby cheap.
+    df['segment_id'] = np.minimum((d * inv_length).astype(np.int32), num_segments - 1)
+
     return df
 
 if __name__ == "__main__":
@@ -3,21 +3,25 @@ import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
 from matplotlib.colors import LinearSegmentedColormap
 import numpy as np
+import streamlit as st
+
+# Target number of points for the drawn path; LineCollection cost is O(N)
+# and anything beyond this is invisible at figure resolution
+MAX_MAP_POINTS = 2000
 
 def plot_track_map(df):
     """
     Generates the track map figure.
-    """
-    # Create custom colormap: Blue (Low) -> Yellow (Med) -> Red (High)
-    colors = ["blue", "yellow", "red"]
-    cmap = LinearSegmentedColormap.from_list("fatigue_cmap", colors)
 
+    The heavy figure construction lives in the cached _build_map, keyed by
+    the (downsampled) coordinate/CLI arrays, so reruns with an unchanged
+    lap reuse the previous figure instead of redrawing it.
+    """
     # Prepare data for LineCollection
     # Points are (longitude, latitude) - which are actually X, Y proxies
-    # Center the map (using min subtraction as requested)
     x_raw = df['longitude']
     y_raw = df['latitude']
-    
+
     # Smooth the signals
     # Check if we have enough data for rolling window
     window = 20
@@ -27,28 +31,60 @@ def plot_track_map(df):
     else:
         x = x_raw.values
         y = y_raw.values
-    
+
+    cli = df['CLI_smooth'].to_numpy()
+    section = df['section_id'].to_numpy() if 'section_id' in df.columns else None
+
+    # Downsample the path before building segments
+    step = max(1, len(x) // MAX_MAP_POINTS)
+    x = x[::step]
+    y = y[::step]
+    cli = cli[::step]
+    if section is not None:
+        section = section[::step]
+
+    vehicle_id = df['vehicle_id'].iloc[0] if 'vehicle_id' in df.columns else 'Unknown'
+    lap_num = df['lap'].iloc[0] if 'lap' in df.columns else '?'
+
+    # Get Lap Time if available
+    lap_time_str = ""
+    if 'lap_time' in df.columns and not pd.isna(df['lap_time'].iloc[0]):
+        lap_time_str = f" | Lap Time: {df['lap_time'].iloc[0]}"
+
+    return _build_map(x, y, cli, section, vehicle_id, lap_num, lap_time_str)
+
+@st.cache_data(show_spinner=False)
+def _build_map(x, y, cli, section, vehicle_id, lap_num, lap_time_str):
+    """
+    Builds the CLI-colored track figure from prepared arrays.
+    Cached on the array contents so identical laps skip the redraw.
+    """
+    # Create custom colormap: Blue (Low) -> Yellow (Med) -> Red (High)
+    colors = ["blue", "yellow", "red"]
+    cmap = LinearSegmentedColormap.from_list("fatigue_cmap", colors)
+
+    # Center the map (using min subtraction as requested)
     x = x - x.min()
     y = y - y.min()
-    
+
     # Rotate by 30 degrees
     theta = np.radians(30)
     x_rot = x * np.cos(theta) - y * np.sin(theta)
     y_rot = x * np.sin(theta) + y * np.cos(theta)
-    
+
     # Scale coordinates (Normalize to 0-1)
     if x_rot.max() != 0:
         x_rot = x_rot / x_rot.max()
     if y_rot.max() != 0:
         y_rot = y_rot / y_rot.max()
-        
+
     # Stretch Y slightly
     y_rot = y_rot * 1.3
-    
+
     # Use rotated and scaled coordinates
     x = x_rot
     y = y_rot
-    
+
     points = np.array([x, y]).T.reshape(-1, 1, 2)
     segments = np.concatenate([points[:-1], points[1:]], axis=1)
 
@@ -57,18 +93,18 @@ def plot_track_map(df):
     fig = plt.figure(figsize=(12, 10), facecolor='#111111')
     ax = plt.gca()
     ax.set_facecolor('#111111')
-    
+
     # Create LineCollection
     # We color by CLI_smooth.
     lc = LineCollection(segments, cmap=cmap, norm=plt.Normalize(0, 1))
-    lc.set_array(df['CLI_smooth'].iloc[:-1])
+    lc.set_array(cli[:-1])
     lc.set_linewidth(5) # Thicker line
-    
+
     ax.add_collection(lc)
-    
+
     # Auto scale limits
     ax.autoscale()
-    ax.set_aspect('equal', 'box') 
+    ax.set_aspect('equal', 'box')
 
     # Add colorbar
     cbar = plt.colorbar(lc, ax=ax, shrink=0.7)
@@ -76,19 +112,10 @@ def plot_track_map(df):
     cbar.ax.yaxis.set_tick_params(color='white')
     plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color='white')
 
-    # Labels and Title
-    vehicle_id = df['vehicle_id'].iloc[0] if 'vehicle_id' in df.columns else 'Unknown'
-    lap_num = df['lap'].iloc[0] if 'lap' in df.columns else '?'
-    
-    # Get Lap Time if available
-    lap_time_str = ""
-    if 'lap_time' in df.columns and not pd.isna(df['lap_time'].iloc[0]):
-        lap_time_str = f" | Lap Time: {df['lap_time'].iloc[0]}"
-        
     plt.title(f"Driver {vehicle_id} Cognitive Load Map - COTA (Lap {lap_num}{lap_time_str})", color='white', fontsize=14, pad=20)
-    plt.text(0.5, 1.02, "Dead-reckoning reconstruction (no GPS available)", 
+    plt.text(0.5, 1.02, "Dead-reckoning reconstruction (no GPS available)",
              transform=ax.transAxes, ha='center', va='bottom', color='#aaaaaa', fontsize=10)
-    
+
     # Configure axis labels but hide ticks and spines for clean look
     plt.xlabel('Track X (normalized)', color='white')
     plt.ylabel('Track Y (normalized)', color='white')
@@ -97,33 +124,32 @@ def plot_track_map(df):
     for spine in ax.spines.values():
         spine.set_visible(False)
     plt.grid(False)
-    
+
     # Add Section Markers (approximate)
-    if 'section_id' in df.columns:
-        for i in range(0, len(df), len(df)//10):
-            row = df.iloc[i]
+    if section is not None:
+        for i in range(0, len(x), max(1, len(x) // 10)):
             # Use the smoothed and normalized coordinates
-            plt.text(x[i], y[i], str(int(row['section_id'])), 
-                     fontsize=8, color='white', ha='center', va='center', 
+            plt.text(x[i], y[i], str(int(section[i])),
+                     fontsize=8, color='white', ha='center', va='center',
                      bbox=dict(facecolor='#333333', alpha=0.7, edgecolor='none', pad=1))
 
-    # Highlight Top 3 High Load Segments
-    # Use nlargest to get indices of top 3 values
-    top_3 = df['CLI_smooth'].nlargest(3)
-    
-    for rank, (idx, val) in enumerate(top_3.items(), 1):
-        # Ensure idx is within bounds of x/y (it should be as they come from df)
-        if idx < len(x):
-            # Plot marker
-            plt.plot(x[idx], y[idx], 'o', color='#ff0000', markersize=12, markeredgecolor='white', markeredgewidth=2, zorder=10)
-            
-            # Add label with some offset
-            plt.annotate(f"High Load #{rank}\n({val:.2f})", 
-                         xy=(x[idx], y[idx]), 
-                         xytext=(10, 10), textcoords='offset points',
-                         fontsize=9, color='white', fontweight='bold',
-                         arrowprops=dict(arrowstyle='->', color='white'),
-                         bbox=dict(facecolor='#ff0000', alpha=0.8, edgecolor='none', pad=3),
-                         zorder=11)
+    # Highlight Top 3 High Load Segments: one PathCollection for all
+    # markers instead of a Line2D per marker
+    k = min(3, len(cli))
+    top_3 = np.argpartition(-cli, k - 1)[:k] if len(cli) > k else np.arange(len(cli))
+    top_3 = top_3[np.argsort(-cli[top_3])]
+
+    ax.scatter(x[top_3], y[top_3], s=144, c='#ff0000',
+               edgecolors='white', linewidths=2, zorder=10)
+
+    for rank, idx in enumerate(top_3, 1):
+        # Add label with some offset
+        ax.annotate(f"High Load #{rank}\n({cli[idx]:.2f})",
+                    xy=(x[idx], y[idx]),
+                    xytext=(10, 10), textcoords='offset points',
+                    fontsize=9, color='white', fontweight='bold',
+                    arrowprops=dict(arrowstyle='->', color='white'),
+                    bbox=dict(facecolor='#ff0000', alpha=0.8, edgecolor='none', pad=3),
+                    zorder=11)
 
     return fig